@@ -1,13 +1,16 @@
+from joblib import Memory
 from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
-from sklearn.manifold import TSNE
 import matplotlib.pyplot as plt
 import seaborn as sns
-import umap.umap_ as umap
+import importlib.util
+import numpy as np
 import os
 
 from ark.utils import misc_utils
 
+# below this many cells Barnes-Hut tSNE is competitive with FIt-SNE
+FITSNE_MIN_CELLS = 5000
+
 
 def plot_dim_reduced_data(component_one, component_two, fig_id, hue, cell_data,
                           title, title_fontsize=24, palette="Spectral", alpha=0.3,
@@ -25,7 +28,8 @@ def plot_dim_reduced_data(component_one, component_two, fig_id, hue, cell_data,
         hue (pandas.Series):
             define the hue for each data point
         cell_data (pandas.DataFrame):
-            Dataframe containing columns for dimensionality reduction and category
+            Dataframe containing columns for dimensionality reduction and category,
+            can be None if the components and hue are passed as arrays or Series
         title (str):
             the title we wish to set for the graph
         title_fontsize (int):
@@ -62,8 +66,99 @@ def plot_dim_reduced_data(component_one, component_two, fig_id, hue, cell_data,
         misc_utils.save_figure(save_dir, save_file, dpi=dpi)
 
 
+def _resolve_accelerator(accelerator):
+    """Resolves the `"auto"` accelerator to the first installed backend
+
+    Args:
+        accelerator (str):
+            Name of the accelerator, must be auto, sklearnex, cuml, or none
+
+    Returns:
+        str:
+            `"cuml"` or `"sklearnex"` if installed and `accelerator` is `"auto"`,
+            otherwise `accelerator` itself (`"none"` if `"auto"` finds no backend)
+    """
+
+    if accelerator != "auto":
+        return accelerator
+
+    for backend in ["cuml", "sklearnex"]:
+        if importlib.util.find_spec(backend) is not None:
+            return backend
+
+    return "none"
+
+
+def _build_reducer(algorithm, accelerator):
+    """Creates the dimensionality reduction estimator for the given backend
+
+    Args:
+        algorithm (str):
+            Name of dimensionality reduction algorithm, must be UMAP, PCA, or tSNE
+        accelerator (str):
+            Name of the resolved accelerator, must be sklearnex, cuml, or none
+
+    Returns:
+        object:
+            An unfitted estimator exposing `fit_transform`
+    """
+
+    # the backends are imported lazily, umap in particular pulls in numba at import time
+    if accelerator == "cuml":
+        # cuML mirrors the input type, so numpy in gives numpy out
+        import cuml
+        reducers = {"UMAP": cuml.UMAP, "PCA": cuml.PCA, "tSNE": cuml.TSNE}
+        return reducers[algorithm]()
+
+    if algorithm == "UMAP":
+        # sklearnex does not provide UMAP so the stock implementation is always used
+        import umap.umap_ as umap
+        return umap.UMAP()
+    elif algorithm == "PCA":
+        if accelerator == "sklearnex":
+            from sklearnex.decomposition import PCA
+        else:
+            from sklearn.decomposition import PCA
+        return PCA()
+    elif algorithm == "tSNE":
+        # use the oneDAL estimators directly rather than globally patching sklearn
+        if accelerator == "sklearnex":
+            from sklearnex.manifold import TSNE
+        else:
+            from sklearn.manifold import TSNE
+        return TSNE()
+
+
+def _fit_transform(algorithm, accelerator, data):
+    """Fits the dimensionality reduction on `data` and returns the embedding
+
+    Large tSNE inputs are routed through openTSNE's FFT-accelerated interpolation
+    (FIt-SNE) if it is installed and no other accelerator was requested.
+
+    Args:
+        algorithm (str):
+            Name of dimensionality reduction algorithm, must be UMAP, PCA, or tSNE
+        accelerator (str):
+            Name of the resolved accelerator, must be sklearnex, cuml, or none
+        data (numpy.ndarray):
+            The cells x features matrix to reduce
+
+    Returns:
+        numpy.ndarray:
+            The embedding of `data`, one row per cell
+    """
+
+    if algorithm == "tSNE" and accelerator == "none" and data.shape[0] >= FITSNE_MIN_CELLS \
+            and importlib.util.find_spec("openTSNE") is not None:
+        from openTSNE import TSNE as FItSNE
+        return np.asarray(FItSNE(n_jobs=-1, negative_gradient_method="fft").fit(data))
+
+    return _build_reducer(algorithm, accelerator).fit_transform(data)
+
+
 def visualize_dimensionality_reduction(cell_data, columns, category, color_map="Spectral",
-                                       algorithm="UMAP", dpi=None, save_dir=None):
+                                       algorithm="UMAP", accelerator="none", cache_dir=None,
+                                       dpi=None, save_dir=None):
     """Plots the dimensionality reduction of specified population columns
 
     Args:
@@ -77,6 +172,16 @@ def visualize_dimensionality_reduction(cell_data, columns, category, color_map="
             Name of MatPlotLib ColorMap used
         algorithm (str):
             Name of dimensionality reduction algorithm, must be UMAP, PCA, or tSNE
+        accelerator (str):
+            Backend used to fit the reduction, must be auto, sklearnex, cuml, or none.
+            `"auto"` picks cuml, then sklearnex, whichever is installed first.
+            Note that cuml results are not deterministic across runs.
+            With `"none"`, tSNE on at least `FITSNE_MIN_CELLS` cells uses openTSNE if
+            it is installed.
+        cache_dir (str):
+            Directory used to cache fitted embeddings, default is None (no caching).
+            Repeated calls with the same columns, algorithm, and accelerator reload
+            the embedding from disk instead of refitting.
         dpi (float):
             The resolution of the image to save, ignored if save_dir is None
         save_dir (str):
@@ -85,35 +190,29 @@ def visualize_dimensionality_reduction(cell_data, columns, category, color_map="
 
     cell_data = cell_data.dropna()
     dim_reduction_algos = ["UMAP", "PCA", "tSNE"]
+    accelerators = ["auto", "sklearnex", "cuml", "none"]
 
     misc_utils.verify_in_list(algorithm=algorithm,
                               dimensionality_reduction_algorithms=dim_reduction_algos)
+    misc_utils.verify_in_list(accelerator=accelerator, accelerators=accelerators)
 
-    graph_title = "%s projection of data" % algorithm
-
-    if algorithm == "UMAP":
-        reducer = umap.UMAP()
-
-        column_data = cell_data[columns].values
-        scaled_column_data = StandardScaler().fit_transform(column_data)
-        embedding = reducer.fit_transform(scaled_column_data)
+    accelerator = _resolve_accelerator(accelerator)
 
-        plot_dim_reduced_data(embedding[:, 0], embedding[:, 1], fig_id=1,
-                              hue=cell_data[category], cell_data=cell_data, title=graph_title,
-                              dpi=dpi, save_dir=save_dir, save_file="UMAPVisualization.png")
+    graph_title = "%s projection of data" % algorithm
+    fig_ids = {"UMAP": 1, "PCA": 2, "tSNE": 3}
 
-    elif algorithm == "PCA":
-        pca = PCA()
-        pca_result = pca.fit_transform(cell_data[columns].values)
+    # materialize the features once as float32, every backend accepts it
+    column_data = cell_data[columns].to_numpy(dtype=np.float32)
 
-        plot_dim_reduced_data(pca_result[:, 0], pca_result[:, 1], fig_id=2,
-                              hue=cell_data[category], cell_data=cell_data, title=graph_title,
-                              dpi=dpi, save_dir=save_dir, save_file="PCAVisualization.png")
+    if algorithm == "UMAP":
+        column_data = StandardScaler(copy=False).fit_transform(column_data)
 
-    elif algorithm == "tSNE":
-        tsne = TSNE()
-        tsne_results = tsne.fit_transform(cell_data[columns].values)
+    # joblib hashes the array contents, so identical inputs hit the cache
+    fit_transform = Memory(location=cache_dir, compress=3, verbose=0).cache(_fit_transform)
+    embedding = fit_transform(algorithm, accelerator, column_data)
 
-        plot_dim_reduced_data(tsne_results[:, 0], tsne_results[:, 1], fig_id=3,
-                              hue=cell_data[category], cell_data=cell_data, title=graph_title,
-                              dpi=dpi, save_dir=save_dir, save_file="tSNEVisualization.png")
+    # the components and hue are passed directly so seaborn never sees the full table
+    plot_dim_reduced_data(embedding[:, 0], embedding[:, 1], fig_id=fig_ids[algorithm],
+                          hue=cell_data[category], cell_data=None, title=graph_title,
+                          dpi=dpi, save_dir=save_dir,
+                          save_file="%sVisualization.png" % algorithm)
@@ -1,5 +1,7 @@
 import tempfile
 import os
+import sys
+import numpy as np
 import pytest
 
 from ark.analysis import dimensionality_reduction
@@ -32,6 +34,61 @@ def test_plot_dim_reduced_data():
                                                        save_dir=".")
 
 
+def test_resolve_accelerator(mocker):
+    # explicit accelerators are passed through untouched
+    for accelerator in ['sklearnex', 'cuml', 'none']:
+        assert dimensionality_reduction._resolve_accelerator(accelerator) == accelerator
+
+    # auto falls back to none when no backend is installed
+    mocker.patch('importlib.util.find_spec', return_value=None)
+    assert dimensionality_reduction._resolve_accelerator('auto') == 'none'
+
+    # auto picks sklearnex if it is the only backend installed
+    mocker.patch('importlib.util.find_spec',
+                 side_effect=lambda name: object() if name == 'sklearnex' else None)
+    assert dimensionality_reduction._resolve_accelerator('auto') == 'sklearnex'
+
+
+def test_fit_transform_fitsne(mocker):
+    test_data = np.random.rand(50, 5)
+
+    # stand in for openTSNE so the FIt-SNE branch can be exercised without it installed
+    fake_opentsne = mocker.MagicMock()
+    fake_opentsne.TSNE.return_value.fit.return_value = np.zeros((50, 2))
+    mocker.patch.dict(sys.modules, {'openTSNE': fake_opentsne})
+    mocker.patch('importlib.util.find_spec', return_value=object())
+
+    # below the cell threshold, openTSNE is not used
+    mocker.patch.object(dimensionality_reduction, 'FITSNE_MIN_CELLS', 100)
+    dimensionality_reduction._fit_transform('tSNE', 'none', test_data)
+    fake_opentsne.TSNE.assert_not_called()
+
+    # at or above the cell threshold, openTSNE is used
+    mocker.patch.object(dimensionality_reduction, 'FITSNE_MIN_CELLS', 50)
+    embedding = dimensionality_reduction._fit_transform('tSNE', 'none', test_data)
+    fake_opentsne.TSNE.assert_called_once_with(n_jobs=-1, negative_gradient_method='fft')
+    assert embedding.shape == (50, 2)
+
+
+def test_dimensionality_reduction_cache(mocker):
+    random_cell_data = test_utils.make_cell_table(300)
+    test_cols = test_utils.TEST_MARKERS
+
+    build_spy = mocker.spy(dimensionality_reduction, '_build_reducer')
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for _ in range(2):
+            dimensionality_reduction.visualize_dimensionality_reduction(random_cell_data,
+                                                                        test_cols,
+                                                                        settings.CELL_TYPE,
+                                                                        algorithm='PCA',
+                                                                        cache_dir=cache_dir)
+
+        # the second call should load the embedding from the cache
+        assert build_spy.call_count == 1
+        assert len(os.listdir(cache_dir)) > 0
+
+
 def test_dimensionality_reduction():
     random_cell_data = test_utils.make_cell_table(300)
     test_cols = test_utils.TEST_MARKERS
@@ -45,6 +102,13 @@ def test_dimensionality_reduction():
                                                                     settings.CELL_TYPE,
                                                                     algorithm="bad_alg")
 
+    with pytest.raises(ValueError):
+        # trying to specify an accelerator that does not exist
+        dimensionality_reduction.visualize_dimensionality_reduction(random_cell_data,
+                                                                    test_cols,
+                                                                    settings.CELL_TYPE,
+                                                                    accelerator="bad_accel")
+
     with tempfile.TemporaryDirectory() as temp_dir:
         for alg in test_algorithms:
             # test without saving, assert that the path does not exist